@@ -1,6 +1,33 @@
-import json
+import functools
+import hashlib
+import re
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from types import MappingProxyType
 from typing import List, Tuple, Union
-from enum import Enum
+from enum import Enum, IntEnum
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+_loads = _json.loads
+
+# numpy is optional, it is only imported on first use by apply_path_batch
+_np = None
+
+def _load_numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
 
 ESC = chr(27)
 BOLD = ESC + "[1m"
@@ -10,17 +37,84 @@ NORMAL = ESC + "[0m"
 
 # ABI element class and parsing functions
 
+class ABIType(IntEnum):
+    ARRAY = 0
+    TUPLE = 1
+    FUNCTION = 2
+    STRING = 3
+    BYTES = 4
+    STATIC = 5      # any other solidity type (uint256, address, bool...)
+
+# Plain int copies of the codes, comparing them avoids an Enum class attribute lookup
+TYPE_ARRAY = int(ABIType.ARRAY)
+TYPE_TUPLE = int(ABIType.TUPLE)
+TYPE_FUNCTION = int(ABIType.FUNCTION)
+TYPE_STRING = int(ABIType.STRING)
+TYPE_BYTES = int(ABIType.BYTES)
+TYPE_STATIC = int(ABIType.STATIC)
+
+_ABI_TYPE_CODES = {
+    "array": TYPE_ARRAY,
+    "tuple": TYPE_TUPLE,
+    "function": TYPE_FUNCTION,
+    "string": TYPE_STRING,
+    "bytes": TYPE_BYTES,
+}
+
+# Element kinds, as branched on by build_path
+KIND_STATIC_LEAF = 0
+KIND_STRUCT = 1
+KIND_ARRAY = 2
+KIND_DYNAMIC_LEAF = 3
+
+_NO_OFFSETS = array('q')
+_NO_FIELDS = MappingProxyType({})
+
 class ABIElement:
+    __slots__ = ("name", "type", "dimension", "components", "_type_code", "_is_dynamic", "_weight", "_kind",
+                 "_child_offsets", "_field_index")
+
     def __init__(self, name: str, type: str, dimension: int, components: List['ABIElement'] = None):
         
-        if dimension >= 0:
-            assert type == "array"
-            assert len (components) == 1
+        if dimension >= 0 and (type != "array" or not components or len(components) != 1):
+            raise ValueError(f"Element {name} with a dimension must be an array with exactly one component")
 
         self.name = name
         self.type = type
         self.dimension = dimension
         self.components = components or []
+        type_code = _ABI_TYPE_CODES.get(type, TYPE_STATIC)
+        self._type_code = type_code
+
+        # Children are built bottom-up by parse_component, so their cached values are already available
+        self._is_dynamic = type_code == TYPE_STRING or type_code == TYPE_BYTES or dimension == 0 or any(comp._is_dynamic for comp in self.components)
+
+        if self._is_dynamic:
+            self._weight = 1
+        elif type_code == TYPE_ARRAY:
+            self._weight = dimension * self.components[0]._weight
+        elif self.components:
+            self._weight = sum(comp._weight for comp in self.components)
+        else:
+            self._weight = 1
+
+        if type_code == TYPE_TUPLE or type_code == TYPE_FUNCTION:
+            self._kind = KIND_STRUCT
+        elif type_code == TYPE_ARRAY:
+            self._kind = KIND_ARRAY
+        else:
+            self._kind = KIND_DYNAMIC_LEAF if self._is_dynamic else KIND_STATIC_LEAF
+
+        # Struct field lookup: name -> child index, and the slot offset of each child in a static encoding.
+        # Other elements share empty lookups
+        if self._kind == KIND_STRUCT:
+            self._child_offsets = array('q', accumulate((comp._weight for comp in self.components), initial=0))
+            self._field_index = {}
+            for i, comp in enumerate(self.components):
+                self._field_index.setdefault(comp.name, i)
+        else:
+            self._child_offsets = _NO_OFFSETS
+            self._field_index = _NO_FIELDS
     
     def makeRepr(self,level):
         components_str = ""
@@ -29,49 +123,41 @@ class ABIElement:
         header = f"{self.name}(type={self.type})"
         if self.dimension >= 0:
             header += f"[{self.dimension}]"
-        footer = "dynamic" if self.is_dynamic() else "static"
+        footer = "dynamic" if self._is_dynamic else "static"
         return f"{'  '*level}{header} - {footer}\n{components_str}"
 
     def __repr__(self):
         return self.makeRepr(0)
 
     def is_array(self) -> bool:
-        return self.type == "array"
+        return self._kind == KIND_ARRAY
 
     def is_struct(self) -> bool:
-        return self.type == "tuple" or self.type == "function"
+        return self._kind == KIND_STRUCT
 
     def is_dynamic(self) -> bool:
-        return self.type in ["string", "bytes"] or self.dimension == 0 or any(comp.is_dynamic() for comp in self.components)
+        return self._is_dynamic
     
     def is_static(self) -> bool:
-        return not self.is_dynamic()
+        return not self._is_dynamic
     
     def encoding_weight(self) -> int:
-        if self.is_dynamic():
-            return 1
-        
-        if self.is_array():
-            return self.dimension * self.components[0].encoding_weight()
-
-        if self.components:
-            return sum(components.encoding_weight() for components in self.components)
-        
-        return 1
+        return self._weight
 
     def structIndex(self, name: str) -> int:
-        assert self.is_struct()
+        if self._kind != KIND_STRUCT:
+            raise TypeError(f"Element {self.name} is not a struct")
 
-        index = 0
-        for i in range(len(self.components)):
-            if self.components[i].name == name:
-                return index
-            else:
-                index += self.components[i].encoding_weight()
-        return -1
+        return self._struct_index_unchecked(name)
+
+    def _struct_index_unchecked(self, name: str) -> int:
+        # For callers that already checked this element is a struct
+        index = self._field_index.get(name)
+        return self._child_offsets[index] if index is not None else -1
     
     def arrayIndex(self, index: int) -> int:
-        assert self.is_array()
+        if self._kind != KIND_ARRAY:
+            raise TypeError(f"Element {self.name} is not an array")
 
         if self.dimension == 0:
             raise ValueError(f"Cannot compute static array index for dynamic array {self.name}")
@@ -82,16 +168,15 @@ class ABIElement:
         return (index if index >= 0 else self.dimension + index) * self.components[0].encoding_weight()
 
     def nextInStruct(self, name):
-        assert self.is_struct()
+        if self._kind != KIND_STRUCT:
+            raise TypeError(f"Element {self.name} is not a struct")
 
-        for i in range(len(self.components)):
-            if self.components[i].name == name:
-                return self.components[i]
-                
-        return None
+        index = self._field_index.get(name)
+        return self.components[index] if index is not None else None
     
     def nextInArray(self):
-        assert self.is_array()
+        if self._kind != KIND_ARRAY:
+            raise TypeError(f"Element {self.name} is not an array")
 
         return self.components[0]
 
@@ -101,9 +186,9 @@ def parse_component(data: dict) -> ABIElement:
     if '[' in type and ']' in type:
         dimension_str = type.split('[')[-1].split(']')[0]
         dimension = int(dimension_str) if dimension_str else 0
-        data['type'] = type[:type.rfind('[')]
-        data['name'] = "_"
-        components = [parse_component(data)]
+        # Parse the item type from a new dict, the caller's data may be shared
+        inner = {'type': type[:type.rfind('[')], 'name': "_", 'components': data.get('components', [])}
+        components = [parse_component(inner)]
         return ABIElement(name, "array", dimension, components)
     else:
         dimension = -1
@@ -116,11 +201,38 @@ def parse_function(data: List) -> ABIElement:
     components = [parse_component(comp) for comp in data.get('inputs', [])]
     return ABIElement(name,type,-1,components)
 
-def parse_json(json_data: str) -> List[ABIElement]:
-    data = json.loads(json_data)
-    functions = [parse_function(func) for func in data]
+# Parsed ABIs are cached and shared between callers, they must not be modified.
+# The cache keys on a digest of the JSON, so that it does not keep the ABI sources alive
+_PARSE_CACHE_SIZE = 128
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+def parse_json(json_data: Union[str, bytes]) -> Tuple[ABIElement, ...]:
+    raw = json_data.encode() if isinstance(json_data, str) else json_data
+    key = hashlib.sha256(raw).digest()
+
+    with _parse_cache_lock:
+        functions = _parse_cache.get(key)
+        if functions is not None:
+            _parse_cache.move_to_end(key)
+            return functions
+
+    # Parse outside the lock, a concurrent miss on the same JSON keeps the first result stored
+    data = _loads(json_data)
+    functions = tuple(parse_function(func) for func in data)
+
+    with _parse_cache_lock:
+        functions = _parse_cache.setdefault(key, functions)
+        _parse_cache.move_to_end(key)
+        if len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
     return functions
 
+def parse_json_file(path: str) -> Tuple[ABIElement, ...]:
+    # Goes through the parse_json cache, an edited file has a new digest and is parsed again
+    with open(path, 'rb') as file:
+        return parse_json(file.read())
+
 # ABI path classes and builder functions
 
 class PathElementType(Enum):
@@ -136,7 +248,52 @@ class PathLeafType(Enum):
     STATIC_LEAF = 3     # Final offset contains static encoded value (typ data on 32 bytes)
     DYNAMIC_LEAF = 4    # Final offset contains dynamic encoded value (typ length + data)
 
-class PathElement:
+# Pre-rendered TLV display pieces, per element type
+_TAG_STR = {t: f"{BOLD_RED}{t.value:02x}{NORMAL}" for t in PathElementType}
+_LEN_STR = {n: f"{ITALIC}{n:02x}{NORMAL}" for n in (0, 1, 2, 4)}
+_TLV_LENGTH = {
+    PathElementType.TUPLE_ELEMENT: 2,
+    PathElementType.ARRAY_ELEMENT: 4,
+    PathElementType.REF_ELEMENT: 0,
+    PathElementType.LEAF_ELEMENT: 1,
+    PathElementType.SLICE_ELEMENT: 4,
+}
+
+# Binary TLV layouts (tag, length, value...), array indexes and slice bounds are signed
+_TLV_STRUCT = {
+    PathElementType.TUPLE_ELEMENT: struct.Struct(">BBH"),
+    PathElementType.ARRAY_ELEMENT: struct.Struct(">BBhH"),
+    PathElementType.REF_ELEMENT: struct.Struct(">BB"),
+    PathElementType.LEAF_ELEMENT: struct.Struct(">BBB"),
+    PathElementType.SLICE_ELEMENT: struct.Struct(">BBhh"),
+}
+_TLV_FIELDS = {
+    PathElementType.TUPLE_ELEMENT: lambda e: (e.index,),
+    PathElementType.ARRAY_ELEMENT: lambda e: (e.index, e.items_weight),
+    PathElementType.REF_ELEMENT: lambda e: (),
+    PathElementType.LEAF_ELEMENT: lambda e: (e.leaf_type.value,),
+    PathElementType.SLICE_ELEMENT: lambda e: (e.start, e.end),
+}
+
+# Opcodes of a compiled path program, see Path.compile
+OP_TUPLE = 0    # (OP_TUPLE, byte_index)
+OP_ARRAY = 1    # (OP_ARRAY, index, step_bytes, item_byte_offset)
+OP_REF = 2      # (OP_REF,)
+OP_LEAF = 3     # (OP_LEAF, leaf_type)
+OP_SLICE = 4    # (OP_SLICE, start, end)
+
+class _Frozen:
+    # Paths and their elements are shared through the build_path cache, attributes can only be set in __init__
+    # through object.__setattr__
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+class PathElement(_Frozen):
     """
     PathElement class represents an element in a binary path. It can be of different types such as tuple element, array element, leaf element, or slice element.
 
@@ -158,15 +315,21 @@ class PathElement:
         __init__(start: int, end: int): Initializes a slice element.
         __repr__(): Returns a string representation of the path element.
         to_string(): Converts the path element to a binary string representation ("(1).[2].(0)").
-        to_bytes(): Converts the path element to a byte representation. This is the data being signed by the CAL.
+        to_bytes_raw(): Converts the path element to its binary TLV encoding. This is the data being signed by the CAL.
+        to_bytes_display(): Converts the path element to a colored hex display of its TLV encoding.
+        to_bytes(): Alias of to_bytes_display().
     """
+    # _to_string and _to_bytes_display are rendered on first use, the slots stay unset until then
+    __slots__ = ("type", "index", "items_weight", "start", "end", "leaf_type", "_to_string", "_to_bytes_display")
+
     def __init__(self, type: PathElementType, index: int = None, items: int = None, start: int = None, end: int = None, leaf_type: PathLeafType = None):
-        self.type = type
-        self.index = index
-        self.items_weight = items
-        self.start = start
-        self.end = end
-        self.leaf_type = leaf_type
+        init = object.__setattr__
+        init(self, "type", type)
+        init(self, "index", index)
+        init(self, "items_weight", items)
+        init(self, "start", start)
+        init(self, "end", end)
+        init(self, "leaf_type", leaf_type)
         
     @classmethod
     def from_tuple(cls, index: int):
@@ -204,6 +367,29 @@ class PathElement:
             return ""
         
     def to_string(self):
+        try:
+            return self._to_string
+        except AttributeError:
+            object.__setattr__(self, "_to_string", self._make_string())
+            return self._to_string
+
+    def to_bytes_raw(self) -> bytes:
+        # Packed on demand, apply_path does not need the TLV encoding of values that do not fit it
+        try:
+            return _TLV_STRUCT[self.type].pack(self.type.value, _TLV_LENGTH[self.type], *_TLV_FIELDS[self.type](self))
+        except struct.error as e:
+            raise ValueError(f"{self!r} does not fit its TLV encoding: {e}") from e
+
+    def to_bytes_display(self):
+        try:
+            return self._to_bytes_display
+        except AttributeError:
+            object.__setattr__(self, "_to_bytes_display", self._make_bytes_display())
+            return self._to_bytes_display
+
+    to_bytes = to_bytes_display
+
+    def _make_string(self):
         if self.type == PathElementType.TUPLE_ELEMENT:
             return f"({self.index})"
         elif self.type == PathElementType.ARRAY_ELEMENT:
@@ -224,36 +410,18 @@ class PathElement:
         else:
             return ""
     
-    def to_bytes(self):
-        tag = self.type.value
-        if self.type == PathElementType.TUPLE_ELEMENT:
-            length = 2
-            value = f"{self.index:04x}"
-        elif self.type == PathElementType.ARRAY_ELEMENT:
-            length = 4
-            index = self.index & 0xFFFF  # Ensure two's complement for negative values
-            value = f"{index:04x}{self.items_weight:04x}"
-        elif self.type == PathElementType.REF_ELEMENT:
-            length = 0
-            value = ""
-        elif self.type == PathElementType.LEAF_ELEMENT:
-            length = 1
-            value = f"{self.leaf_type.value:02x}"
-        elif self.type == PathElementType.SLICE_ELEMENT:
-            length=4
-            value = f"{self.start:04x}{self.end:04x}"
-        
-        tag_str = BOLD_RED + f"{tag:02x}" + NORMAL
-        length_str = ITALIC + f"{length:02x}" + NORMAL
+    def _make_bytes_display(self):
+        # Formatted from the packed TLV, so that the display always matches the encoded bytes
+        raw = self.to_bytes_raw()
+        value = f"{raw[2:].hex()} " if len(raw) > 2 else ""
+        return f"{_TAG_STR[self.type]} {_LEN_STR[raw[1]]} {value}"
 
-        return f"{tag_str} {length_str} {value} " if value else f"{tag_str} {length_str} "
-
-class Path:
+class Path(_Frozen):
     """
     Represents a path in the calldata.
 
     Attributes:
-        path (List[PathElement]): A list of PathElement objects that make up the path.
+        path (Tuple[PathElement]): The PathElement objects that make up the path.
 
     Methods:
         __init__(path: List[PathElement]):
@@ -266,9 +434,18 @@ class Path:
             Returns a string representation of the Path object.
         to_string():
             Converts the path to a string representation, joining elements with a dot.
+        to_bytes_raw():
+            Converts the path to its binary encoding, concatenating the element TLVs.
+        to_bytes_display():
+            Converts the path to a colored hex display, joining elements as TLVs.
         to_bytes():
-            Converts the path to a byte representation, joining elements as TLVs.
+            Alias of to_bytes_display().
+        compile():
+            Converts the path to a tuple of (opcode, args...) instructions, as run by apply_path.
+            The leaf and slice instructions select the final read performed by apply_path.
     """
+    # _walk is compiled on first use by apply_path, the slot stays unset until then
+    __slots__ = ("path", "_walk")
 
     def __init__(self, path: List['PathElement']):
         assert len(path) >= 2
@@ -288,76 +465,167 @@ class Path:
             if element.type != PathElementType.ARRAY_ELEMENT and element.type != PathElementType.TUPLE_ELEMENT and element.type != PathElementType.REF_ELEMENT:
                 raise ValueError("Middle of the path must be TUPLE, ARRAY or REF elements")
 
-        self.path = path
+        object.__setattr__(self, "path", tuple(path))
 
     def __repr__(self):
         return f"Path(path={self.path})"
 
+    def _compiled(self) -> tuple:
+        # apply_path only walks the program up to the leaf, then runs the terminal read selected by the leaf type.
+        # Returns (program, terminal, slice), slice is a (start, end) tuple or None
+        try:
+            return self._walk
+        except AttributeError:
+            pass
+        program = self.compile()
+        if program[-1][0] == OP_SLICE:
+            slice = program[-1][1:]
+            program = program[:-1]
+        else:
+            slice = None
+        object.__setattr__(self, "_walk", (program[:-1], _TERMINALS[program[-1][1]], slice))
+        return self._walk
+
+    def compile(self) -> tuple:
+        program = []
+        for element in self.path:
+            if element.type == PathElementType.TUPLE_ELEMENT:
+                program.append((OP_TUPLE, element.index * 32))
+            elif element.type == PathElementType.ARRAY_ELEMENT:
+                # Offset past the length slot to the item, relative to the array end for negative indexes
+                step = element.items_weight * 32
+                program.append((OP_ARRAY, element.index, step, 32 + element.index * step))
+            elif element.type == PathElementType.REF_ELEMENT:
+                program.append((OP_REF,))
+            elif element.type == PathElementType.LEAF_ELEMENT:
+                program.append((OP_LEAF, element.leaf_type.value))
+            elif element.type == PathElementType.SLICE_ELEMENT:
+                program.append((OP_SLICE, element.start, element.end))
+        return tuple(program)
+
     def to_string(self):
         return "".join([element.to_string() for element in self.path])
 
-    def to_bytes(self):
-        return "".join([element.to_bytes() for element in self.path])
+    def to_bytes_raw(self) -> bytes:
+        return b"".join([element.to_bytes_raw() for element in self.path])
+
+    def to_bytes_display(self):
+        return "".join([element.to_bytes_display() for element in self.path])
+
+    to_bytes = to_bytes_display
 
 # Path building functions
+
+_LEAF_TYPE_BY_KIND = {
+    KIND_ARRAY: PathLeafType.ARRAY_LEAF,
+    KIND_STRUCT: PathLeafType.TUPLE_LEAF,
+    KIND_DYNAMIC_LEAF: PathLeafType.DYNAMIC_LEAF,
+    KIND_STATIC_LEAF: PathLeafType.STATIC_LEAF,
+}
+
+# Path selector tokens: (TOKEN_FIELD, text, name), (TOKEN_INDEX, text, index), (TOKEN_SLICE, text, start, end)
+# A "[]" slice selector has no bounds, start and end are None
+TOKEN_FIELD = 0
+TOKEN_INDEX = 1
+TOKEN_SLICE = 2
+
+_TOKEN_RE = re.compile(r'\[(?:(-?\d+):(-?\d+)|(-?\d+))?\]|([A-Za-z_$][\w$]*)')
+
+def _tokenize_path(path: str) -> List[tuple]:
+    tokens = []
+    pos = 0
+    while True:
+        match = _TOKEN_RE.match(path, pos)
+        if not match:
+            raise ValueError(f"Path {path} - Invalid selector at position {pos}")
+
+        start, end, index, name = match.groups()
+        text = match.group(0)
+        if name is not None:
+            tokens.append((TOKEN_FIELD, text, name))
+        elif index is not None:
+            tokens.append((TOKEN_INDEX, text, int(index)))
+        elif start is not None:
+            tokens.append((TOKEN_SLICE, text, int(start), int(end)))
+        else:
+            tokens.append((TOKEN_SLICE, text, None, None))
+
+        pos = match.end()
+        if pos == len(path):
+            return tokens
+        if path[pos] != '.':
+            raise ValueError(f"Path {path} - Expected '.' at position {pos}")
+        pos += 1
+
+# Paths and their elements are immutable (see _Frozen), so a path built once is shared between callers.
+# The cache keys on the root element itself, which keeps it alive while cached, unlike keying on id().
+# Like the parse_json results it comes from, the ABIElement tree must not be modified once built
+@functools.lru_cache(maxsize=10_000)
 def build_path(path: str, root_function: ABIElement) -> Path:
 
-    elements = path.split('.')
+    tokens = _tokenize_path(path)
 
-    # pop the slice selector
-    slice = elements.pop() if elements[-1] == "[]" or ':' in elements[-1] else None
+    # Split the slice selector
+    if tokens[-1][0] == TOKEN_SLICE:
+        slice = tokens[-1]
+        tokens = tokens[:-1]
+    else:
+        slice = None
 
     path_elements = []   
     
-    if len(elements) == 0:
+    if len(tokens) == 0:
         raise ValueError("Path must have at least one element beyond the slice selector")
 
     next_abi_element = root_function
     
     # While the current element is dynamic, emit TUPLE_ELEMENT and ARRAY_ELEMENT path elements
     # Otherwise accumlate offsets to get to the final static element
-    is_static = next_abi_element.is_static()
+    is_static = not next_abi_element._is_dynamic
     static_offset = 0
 
-    for index,element in enumerate(elements): 
+    for index,token in enumerate(tokens): 
         
+        kind = token[0]
+        element = token[1]
         current_abi_element = next_abi_element
-        if is_static and current_abi_element.is_dynamic():
+        if is_static and current_abi_element._is_dynamic:
             raise ValueError(f"Path element {index}:{element} - Unexpected dynamic element")
         
-        if not element.startswith('['):
+        if kind == TOKEN_FIELD:
             # Structure selector
-            if not current_abi_element.is_struct():
+            if current_abi_element._kind != KIND_STRUCT:
                 raise ValueError(f"Path element {index}:{element} - Unexpected structure selector")
 
-            next_abi_element = current_abi_element.nextInStruct(element)
+            next_abi_element = current_abi_element.nextInStruct(token[2])
 
             if not next_abi_element:
                 raise ValueError(f"Path element {index}:{element} - Structure not found in ABI")
         
             if is_static:
-                static_offset += current_abi_element.structIndex(element)
+                static_offset += current_abi_element._struct_index_unchecked(token[2])
             else:
-                path_elements.append(PathElement.from_tuple(current_abi_element.structIndex(element)))
-        else:
+                path_elements.append(PathElement.from_tuple(current_abi_element._struct_index_unchecked(token[2])))
+        elif kind == TOKEN_INDEX:
             # Array selector
-            if not current_abi_element.is_array():
+            if current_abi_element._kind != KIND_ARRAY:
                 raise ValueError(f"Path element {index}:{element} - Unexpected array selector")
             
             next_abi_element = current_abi_element.nextInArray()
 
             if is_static:
-                static_offset += current_abi_element.arrayIndex(int(element[1:-1]))
+                static_offset += current_abi_element.arrayIndex(token[2])
             else:
-                array_index = int(element[1:-1])
+                array_index = token[2]
                 if current_abi_element.dimension == 0:
                     path_elements.append(PathElement.from_array(array_index, next_abi_element.encoding_weight()))
                 else:
-                    if array_index < 0:
-                        array_index += current_abi_element.dimension
-                    path_elements.append(PathElement.from_tuple(array_index * next_abi_element.encoding_weight()))
+                    # Bounds checked like a static array selector
+                    path_elements.append(PathElement.from_tuple(current_abi_element.arrayIndex(array_index)))
+        else:
+            raise ValueError(f"Path element {index}:{element} - Unexpected slice selector")
 
-        if next_abi_element.is_dynamic():
+        if next_abi_element._is_dynamic:
             path_elements.append(PathElement.from_ref())
 
     # Emit a last static offset to a static value
@@ -365,77 +633,143 @@ def build_path(path: str, root_function: ABIElement) -> Path:
         path_elements.append(PathElement.from_tuple(static_offset))
 
     # Emit correct leaf type
-
-    if next_abi_element.is_array():
-        path_elements.append(PathElement.from_leaf(PathLeafType.ARRAY_LEAF))
-    elif next_abi_element.is_struct():
-        path_elements.append(PathElement.from_leaf(PathLeafType.TUPLE_LEAF))
-    elif next_abi_element.is_dynamic():
-        path_elements.append(PathElement.from_leaf(PathLeafType.DYNAMIC_LEAF))
-    elif next_abi_element.is_static():
-        path_elements.append(PathElement.from_leaf(PathLeafType.STATIC_LEAF))
+    leaf_kind = next_abi_element._kind
+    path_elements.append(PathElement.from_leaf(_LEAF_TYPE_BY_KIND[leaf_kind]))
 
     # If slice is present, emit a slice element 
     if slice:
         # Slices should only apply to arrays or dynamic, non struct values
-        valid = next_abi_element.is_array() or (next_abi_element.is_dynamic() and not next_abi_element.is_struct())
-        if not valid:
+        if leaf_kind != KIND_ARRAY and leaf_kind != KIND_DYNAMIC_LEAF:
             raise ValueError(f"Path element {index}:{element} - Unexpected slice selector")
 
-        if not slice == "[]":
-            start, end = slice[1:-1].split(':')
-            path_elements.append(PathElement.from_slice(int(start), int(end)))
+        if slice[2] is not None:
+            path_elements.append(PathElement.from_slice(slice[2], slice[3]))
 
     return Path(path_elements)
 
+# Terminal reads of apply_path, one per leaf type. slice is a (start, end) tuple or None
+
+def _read_static(mv: memoryview, offset: int, slice: Tuple[int, int]) -> bytes:
+    return bytes(mv[offset:offset + 32])
+
+def _read_dynamic(mv: memoryview, offset: int, slice: Tuple[int, int]) -> bytes:
+    length = int.from_bytes(mv[offset:offset + 32], 'big')
+    if slice:
+        start = slice[0] if slice[0] >= 0 else length + slice[0]
+        end = slice[1] if slice[1] >= 0 else length + slice[1]
+
+        if start < 0 or end < 0 or start >= length or end >= length:
+            raise ValueError("Slice out of bounds")
+        
+        return bytes(mv[offset + 32 + start:offset + 32 + end])
+    return bytes(mv[offset + 32:offset + 32 + length])
+
+def _read_container(mv: memoryview, offset: int, slice: Tuple[int, int]) -> None:
+    # Arrays and tuples have no value of their own
+    return None
+
+_TERMINALS = {
+    PathLeafType.ARRAY_LEAF.value: _read_container,
+    PathLeafType.TUPLE_LEAF.value: _read_container,
+    PathLeafType.STATIC_LEAF.value: _read_static,
+    PathLeafType.DYNAMIC_LEAF.value: _read_dynamic,
+}
+
 def apply_path(binary_path: Path, input_data: bytes) -> bytes:
 
+    mv = memoryview(input_data)
+    program, terminal, slice = binary_path._compiled()
+
+    from_bytes = int.from_bytes
+
     offset = 0
     ref_offset = 0
 
-    path = binary_path.path
-    slice = path.pop() if path[-1].type == PathElementType.SLICE_ELEMENT else None
+    for op in program:
+        code = op[0]
 
-    for element in path:
-
-        if element.type == PathElementType.TUPLE_ELEMENT:
+        if code == OP_TUPLE:
             ref_offset = offset
-            offset += element.index * 32
+            offset += op[1]
 
-        elif element.type == PathElementType.ARRAY_ELEMENT:
+        elif code == OP_ARRAY:
             ref_offset = offset
-            array_length = int.from_bytes(input_data[offset:offset + 32], byteorder='big')
+            index = op[1]
+            array_length = from_bytes(mv[offset:offset + 32], 'big')
 
-            if element.index >= array_length or element.index < -array_length:
-                raise IndexError(f"Array index {element.index} out of bounds")
-            if element.index < 0:
-                offset += 32 + (array_length + element.index) * element.items_weight * 32
+            if index >= array_length or index < -array_length:
+                raise IndexError(f"Array index {index} out of bounds")
+            if index < 0:
+                offset += op[3] + array_length * op[2]
             else:
-                offset += 32 + element.index * element.items_weight * 32
-
-        elif element.type == PathElementType.REF_ELEMENT:
-            offset = ref_offset + int.from_bytes(input_data[offset:offset + 32], byteorder='big')
-
-        elif element.type == PathElementType.LEAF_ELEMENT:
+                offset += op[3]
+
+        elif code == OP_REF:
+            offset = ref_offset + from_bytes(mv[offset:offset + 32], 'big')
+
+    return terminal(mv, offset, slice)
+
+# Words read by the batch walk must fit in 32 bits, so that offset arithmetic cannot overflow an int64.
+# Larger values are never valid calldata offsets or lengths, and are left to apply_path
+
+def _read_words(data: 'np.ndarray', lengths: 'np.ndarray', offsets: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    # Gather the 32 bytes word at each row offset, flagging rows where it is out of the input or too large
+    np = _np
+    invalid = (offsets < 0) | (offsets + 32 > lengths)
+    index = np.where(invalid, 0, offsets)[:, None] + np.arange(32)
+    block = np.take_along_axis(data, index, axis=1)
+    invalid |= block[:, :28].any(axis=1)
+    words = block[:, 28:].copy().view('>u4').ravel().astype(np.int64)
+    return words, invalid
+
+def apply_path_batch(binary_path: Path, inputs: List[bytes]) -> List[bytes]:
+
+    np = _load_numpy()
+    if np is None or not inputs:
+        return [apply_path(binary_path, input_data) for input_data in inputs]
+
+    # Stack the inputs in a zero padded matrix, at least one word wide
+    lengths = np.array([len(input_data) for input_data in inputs], dtype=np.int64)
+    data = np.zeros((len(inputs), max(int(lengths.max()), 32)), dtype=np.uint8)
+    for i, input_data in enumerate(inputs):
+        data[i, :lengths[i]] = np.frombuffer(input_data, dtype=np.uint8)
+
+    offsets = np.zeros(len(inputs), dtype=np.int64)
+    ref_offsets = np.zeros(len(inputs), dtype=np.int64)
+    fallback = np.zeros(len(inputs), dtype=bool)
+
+    program, terminal, slice = binary_path._compiled()
+    for op in program:
+        code = op[0]
+
+        if code == OP_TUPLE:
+            ref_offsets = offsets.copy()
+            offsets += op[1]
+            continue
+
+        words, invalid = _read_words(data, lengths, offsets)
+        fallback |= invalid
+
+        if code == OP_ARRAY:
+            ref_offsets = offsets.copy()
+            index = op[1]
+            if ((~fallback) & ((index >= words) | (index < -words))).any():
+                raise IndexError(f"Array index {index} out of bounds")
+            if index < 0:
+                offsets += op[3] + words * op[2]
+            else:
+                offsets += op[3]
 
-            if element.leaf_type == PathLeafType.STATIC_LEAF:
-                return input_data[offset:offset + 32]
-            
-            elif element.leaf_type == PathLeafType.DYNAMIC_LEAF:
-                length = int.from_bytes(input_data[offset:offset + 32], byteorder='big')
-                if slice:
-                    start = slice.start if slice.start >= 0 else length + slice.start
-                    end = slice.end if slice.end >= 0 else length + slice.end
-
-                    if start < 0 or end < 0 or start >= length or end >= length:
-                        raise ValueError("Slice out of bounds")
-                    
-                    return input_data[offset + 32 + start:offset + 32 + end]
-                return input_data[offset + 32:offset + 32 + length]
-            
-    #raise ValueError("Path did not resolve to a leaf element")
-    pass
+        elif code == OP_REF:
+            offsets = ref_offsets + words
 
+    results = []
+    for i, input_data in enumerate(inputs):
+        if fallback[i]:
+            results.append(apply_path(binary_path, input_data))
+        else:
+            results.append(terminal(memoryview(input_data), int(offsets[i]), slice))
+    return results
 
 
 # Fill_values fills the path and values of a chunked input data based on the abi_element passed.
@@ -448,7 +782,7 @@ def fill_values(abi_element: ABIElement, chunks: List[str], paths: List[str], va
         for comp in abi_element.components:
             target_path = (current_path + "." if current_path else "") + comp.name
         
-            if comp.is_dynamic():
+            if comp._is_dynamic:
                 # current encoding is one index value to the dynamic data located after in the input data)
                 encoding_location = current_index + int(chunks[current_index + index_in_current_encoding],16) // 32
                 
@@ -460,7 +794,7 @@ def fill_values(abi_element: ABIElement, chunks: List[str], paths: List[str], va
                 encoding_location = current_index + index_in_current_encoding
 
             filled = fill_values(comp, chunks, paths, values, encoding_location, target_path)
-            index_in_current_encoding += filled if not comp.is_dynamic() else 1
+            index_in_current_encoding += filled if not comp._is_dynamic else 1
         return index_in_current_encoding
     
     if abi_element.is_array():
@@ -511,9 +845,9 @@ def fill_values(abi_element: ABIElement, chunks: List[str], paths: List[str], va
                 print(f"Value: {value}")
             else:  
                 value = chunks[current_index + i]
-            if abi_element.type == "string":
+            if abi_element._type_code == TYPE_STRING:
                 values[current_index + i] = bytes.fromhex(value).decode('utf-8')
-            elif abi_element.type == "bytes":
+            elif abi_element._type_code == TYPE_BYTES:
                 values[current_index + i] = bytes.fromhex(value)
             else:
                 values[current_index + i] = chunks[current_index + i]
@@ -571,44 +905,64 @@ test_cases = [
     }
 ]
 
-for test in test_cases:
-    with open(test['abi_file'], 'r') as file:
-        json_data = file.read()
-
-    abi = parse_json(json_data)
+def main():
+    for test in test_cases:
+        abi = parse_json_file(test['abi_file'])
 
-    print(BOLD + '-' * 80 + NORMAL)
-    print(BOLD + f"ABI {test['abi_file']}:\n" + NORMAL)
-    for function in abi:
-        print(function)
+        print(BOLD + '-' * 80 + NORMAL)
+        print(BOLD + f"ABI {test['abi_file']}:\n" + NORMAL)
+        for function in abi:
+            print(function)
 
-    for function in test['functions']:
+        for function in test['functions']:
 
-        print(BOLD + '-' * 80 + NORMAL)
-        print(BOLD + f"Function: {function['name']}\n" + NORMAL)
+            print(BOLD + '-' * 80 + NORMAL)
+            print(BOLD + f"Function: {function['name']}\n" + NORMAL)
         
-        with open(function['input_file'], 'r') as file:
-            input_data = file.read()
+            with open(function['input_file'], 'r') as file:
+                input_data = file.read()
 
-        if input_data.startswith("0x"):
-            selector = input_data[:10]
-            input_data = input_data[10:]
-        input_data_bytes = bytes.fromhex(input_data)
+            if input_data.startswith("0x"):
+                selector = input_data[:10]
+                input_data = input_data[10:]
+            input_data_bytes = bytes.fromhex(input_data)
 
-        print(f"Selector: {selector}")
-        chunks = [input_data[i:i+64] for i in range(0, len(input_data)-1, 64)]
+            print(f"Selector: {selector}")
+            chunks = [input_data[i:i+64] for i in range(0, len(input_data)-1, 64)]
                 
-        # find function with name "test_static"
-        abi_function = next((func for func in abi if func.name == function['name']), None)
-
-        display_chunks_and_paths(abi_function, chunks)
-
-        paths = function['paths']
-
-        print(BOLD + '-' * 80 + NORMAL)
-        print(BOLD + f"Paths:\n" + NORMAL)
-        for p in paths:
-            parsed_path = build_path(p, abi_function)
-            print(f"Path {p}:\n\tBinary_repr: {parsed_path.to_string()}\n\tTLV: {parsed_path.to_bytes()}")
-            value = apply_path(parsed_path, input_data_bytes)
-            print(f"\tValue: {value.hex() if value else 'Array or struct'}")
+            # find function with name "test_static"
+            abi_function = next((func for func in abi if func.name == function['name']), None)
+
+            display_chunks_and_paths(abi_function, chunks)
+
+            paths = function['paths']
+
+            print(BOLD + '-' * 80 + NORMAL)
+            print(BOLD + f"Paths:\n" + NORMAL)
+            for p in paths:
+                parsed_path = build_path(p, abi_function)
+                raw = parsed_path.to_bytes_raw()
+
+                # Each element TLV is a one byte tag (below 0x80, so a single byte DER tag), a one byte length
+                # and that many value bytes, as specified in path.dogma, and must span its packing format
+                pos = 0
+                for element in parsed_path.path:
+                    tag, length = raw[pos], raw[pos + 1]
+                    if tag != element.type.value or tag >= 0x80:
+                        raise ValueError(f"Unexpected tag {tag:02x} for {element!r}")
+                    if 2 + length != _TLV_STRUCT[element.type].size:
+                        raise ValueError(f"Unexpected length {length} for {element!r}")
+                    pos += 2 + length
+                if pos != len(raw):
+                    raise ValueError(f"Trailing bytes after the last TLV: {raw[pos:].hex()}")
+
+                print(f"Path {p}:\n\tBinary_repr: {parsed_path.to_string()}\n\tTLV: {parsed_path.to_bytes_display()}\n\tRaw: {raw.hex()}")
+                value = apply_path(parsed_path, input_data_bytes)
+                print(f"\tValue: {value.hex() if value else 'Array or struct'}")
+
+                # The batch walk must agree with apply_path
+                if apply_path_batch(parsed_path, [input_data_bytes, bytearray(input_data_bytes)]) != [value, value]:
+                    raise ValueError(f"Path {p} - apply_path_batch disagrees with apply_path")
+
+if __name__ == "__main__":
+    main()